@@ -40,8 +40,6 @@ import json
 import yaml
 from time import sleep
 
-from PIL import Image # For custom album art size
-
 # web framework
 from fastapi import FastAPI, Request, Response, HTTPException, Depends, Path
 from fastapi.openapi.utils import get_openapi # docs
@@ -55,7 +53,6 @@ from sse_starlette.sse import EventSourceResponse
 import netifaces as ni
 from socket import gethostname, inet_aton
 from zeroconf import IPVersion, ServiceInfo, Zeroconf
-from multiprocessing import Queue
 
 # amplipi
 import amplipi.utils as utils
@@ -245,6 +242,7 @@ async def get_image(ctrl: Api = Depends(get_ctrl), sid: int = params.SourceID, h
     else:
       img_tmp, _ = urllib.request.urlretrieve(uri, img_tmp)
     size = height, width
+    from PIL import Image # imported here since pillow is slow to load and only needed for custom album art sizes
     img = Image.open(img_tmp)
     img.thumbnail(size)
     img = img.convert(mode="RGB")
@@ -720,7 +718,7 @@ def get_ip_addr(iface: str = 'eth0') -> Optional[str]:
 
 def advertise_service(port, q: Queue):
   """ Advertise the AmpliPi api via zeroconf, can be verified with 'avahi-browse -ar'
-      Expected to be run as a seperate process, eg:
+      Expected to be run as a seperate thread or process, eg:
 
           q = Queue()
           ad = Process(target=amplipi.app.advertise_service, args=(5000, q))
@@ -22,7 +22,8 @@ This initializes the webapplication found in app.py.
 """
 
 import os
-from multiprocessing import Process, Queue
+import threading
+from queue import Queue
 import amplipi.app
 
 MOCK_CTRL = os.environ.get('MOCK_CTRL', 'False').lower() == 'true'
@@ -34,6 +35,8 @@ PORT = int(os.environ.get('WEB_PORT', '80'))
 application = amplipi.app.create_app(delay_saves=True, mock_ctrl=MOCK_CTRL, mock_streams=MOCK_STREAMS)
 
 # advertise the service here, to avoid adding bloat to underlying app, especially for test startup
-# this needs to be done as a separate process to avoid interfering with webserver (ZeroConf makes its own event loop)
-zc_reg = Process(target=amplipi.app.advertise_service, args=(PORT, Queue())) # TODO: unregister zeroconf on shutdown?
+# ZeroConf runs its own event loop in the background, so a daemon thread is enough to keep it from interfering with the webserver
+# without forking and re-importing the whole app in a separate process
+zc_stop: 'Queue[str]' = Queue() # put anything in this to unregister the service
+zc_reg = threading.Thread(target=amplipi.app.advertise_service, args=(PORT, zc_stop), daemon=True) # TODO: unregister zeroconf on shutdown?
 zc_reg.start()
@@ -20,11 +20,10 @@ This module provides complete control of the AmpliPi Audio System's sources,
 zones, groups and streams.
 """
 
-from typing import List, Dict, Set, Union, Optional, Callable
+from typing import List, Dict, Set, Tuple, Union, Optional, Callable
 
 from enum import Enum
 
-from copy import deepcopy
 import os # files
 import time
 
@@ -54,6 +53,8 @@ class ApiCode(Enum):
 
 class ApiResponse:
   """ Ctrl Api Response object """
+  __slots__ = ('code', 'msg') # one of these is created for every api call, skip the per instance dict
+
   def __init__(self, code: ApiCode, msg: str = ''):
     self.code = code
     self.msg = msg
@@ -91,8 +92,15 @@ class Api:
   config_file: str
   backup_config_file: str
   config_file_valid: bool
+  _saved_config: Optional[str] = None # contents of the last successful save
   status: models.Status
   streams: Dict[int, amplipi.streams.AnyStream]
+  _zone_sources: List[int] # each zone's source, indexed like status.zones and passed directly to the runtime
+  _zone_mutes: List[bool] # each zone's mute state, indexed like status.zones and passed directly to the runtime
+  _zone_vols: List[int] # each zone's volume, indexed like status.zones
+  _source_idx: Dict[int, int] # source id -> index in status.sources
+  _zone_idx: Dict[int, int] # zone id -> index in status.zones
+  _group_idx: Dict[int, int] # group id -> index in status.groups
 
   _LAST_PRESET_ID = 9999
   DEFAULT_CONFIG = { # This is the system state response that will come back from the amplipi box
@@ -169,6 +177,7 @@ class Api:
     self.config_file = settings.config_file
     self.backup_config_file = settings.config_file + '.bak'
     self.config_file_valid = True # initially we assume the config file is valid
+    self._saved_config = None
     errors = []
     if config:
       self.status = config
@@ -219,6 +228,10 @@ class Api:
     # save new config if zones were added
     if added_zone:
       self.save()
+    self._source_idx = utils.index_ids(self.status.sources)
+    self._zone_idx = utils.index_ids(self.status.zones)
+    self._group_idx = utils.index_ids(self.status.groups)
+    self._cache_zone_hw_state()
 
     # configure all streams into a known state
     self.streams: Dict[int, amplipi.streams.AnyStream] = {}
@@ -249,6 +262,12 @@ class Api:
     # configure all of the groups (some fields may need to be updated)
     self._update_groups()
 
+  def _cache_zone_hw_state(self) -> None:
+    """ Rebuild the zone source, mute, and volume arrays from the status, needed whenever the zones list changes """
+    self._zone_sources = [zone.source_id for zone in self.status.zones]
+    self._zone_mutes = [zone.mute for zone in self.status.zones]
+    self._zone_vols = [zone.vol for zone in self.status.zones]
+
   def __del__(self):
     # stop save in the future so we can save right away
     if self._save_timer:
@@ -258,17 +277,28 @@ class Api:
 
   def save(self) -> None:
     """ Saves the system state to json"""
+    # write the new config next to the old one first, so an interrupted save never leaves a partial config file
+    tmp_config_file = self.config_file + '.tmp'
     try:
+      config = self.status.json(exclude_none=True, indent=2)
+      # skip rewriting the config and its backup (on the Pi's SD card) when nothing has changed since the last save
+      if config == self._saved_config:
+        return
+      with open(tmp_config_file, 'w') as cfg:
+        cfg.write(config)
       # save a backup copy of the config file (assuming its valid)
       if os.path.exists(self.config_file) and self.config_file_valid:
-        if os.path.exists(self.backup_config_file):
-          os.remove(self.backup_config_file)
-        os.rename(self.config_file, self.backup_config_file)
-      with open(self.config_file, 'w') as cfg:
-        cfg.write(self.status.json(exclude_none=True, indent=2))
+        os.replace(self.config_file, self.backup_config_file)
+      os.replace(tmp_config_file, self.config_file)
       self.config_file_valid = True
+      self._saved_config = config
     except Exception as exc:
       print('Error saving config: {}'.format(exc))
+      # don't leave a partially written config behind
+      try:
+        os.remove(tmp_config_file)
+      except OSError:
+        pass
 
   def mark_changes(self):
     """ Mark api changes to update listeners and save the system state in the future
@@ -359,7 +389,7 @@ class Api:
       a stream, or None if input does not specify a valid stream
     """
     if sid is not None:
-      _, src = utils.find(self.status.sources, sid)
+      _, src = utils.find_indexed(self.status.sources, self._source_idx, sid)
     if src is None:
       return None
     idx = src.get_stream()
@@ -390,7 +420,7 @@ class Api:
       Returns:
         'None' on success, otherwise error (dict)
     """
-    idx, src = utils.find(self.status.sources, sid)
+    idx, src = utils.find_indexed(self.status.sources, self._source_idx, sid)
     if idx is not None and src is not None:
       name, _ = utils.updated_val(update.name, src.name)
       input_, input_updated = utils.updated_val(update.input, src.input)
@@ -442,71 +472,13 @@ class Api:
       Returns:
         ApiResponse
     """
-    idx, zone = utils.find(self.status.zones, zid)
-    if idx is not None and zone is not None:
-      name, _ = utils.updated_val(update.name, zone.name)
-      source_id, update_source_id = utils.updated_val(update.source_id, zone.source_id)
-      mute, update_mutes = utils.updated_val(update.mute, zone.mute)
-      vol, update_vol = utils.updated_val(update.vol, zone.vol)
-      disabled, _ = utils.updated_val(update.disabled, zone.disabled)
-      try:
-        sid = utils.parse_int(source_id, [0, 1, 2, 3])
-        vol = utils.parse_int(vol, range(-79, 79)) # hold additional state for group delta volume adjustments, output volume will be saturated to 0dB
-        zones = self.status.zones
-        # update non hw state
-        zone.name = name
-        zone.disabled = disabled
-        if update_source_id or force_update:
-          zone_sources = [zone.source_id for zone in zones]
-          zone_sources[idx] = sid
-          if self._rt.update_zone_sources(idx, zone_sources):
-            zone.source_id = sid
-          else:
-            return ApiResponse.error('set zone failed: unable to update zone source')
-
-        def set_mute():
-          mutes = [zone.mute for zone in zones]
-          mutes[idx] = mute
-          if self._rt.update_zone_mutes(idx, mutes):
-            zone.mute = mute
-          else:
-            raise Exception('set zone failed: unable to update zone mute')
-
-        def set_vol():
-          real_vol = utils.clamp(vol, -79, 0)
-          if self._rt.update_zone_vol(idx, real_vol):
-            zone.vol = vol
-          else:
-            raise Exception('set zone failed: unable to update zone volume')
-
-        # To avoid potential unwanted loud output:
-        # If muting, mute before setting volumes
-        # If un-muting, set desired volume first
-        try:
-          if force_update or (update_mutes and update_vol):
-            if mute:
-              set_mute()
-              set_vol()
-            else:
-              set_vol()
-              set_mute()
-          elif update_vol:
-            set_vol()
-          elif update_mutes:
-            set_mute()
-        except Exception as exc:
-          return ApiResponse.error(str(exc))
-
-        if not internal:
-          # update the group stats (individual zone volumes, sources, and mute configuration can effect a group)
-          self._update_groups()
-          self.mark_changes()
-
-        return ApiResponse.ok()
-      except Exception as exc:
-        return ApiResponse.error('set zone: '  + str(exc))
-    else:
-        return ApiResponse.error('set zone: index {} out of bounds'.format(idx))
+    # a single zone is just a batch of one, this keeps the zone update rules in one place
+    resp = self._set_zones_by_preamp([(zid, update)], force_update=force_update)
+    if not internal:
+      # update the group stats (individual zone volumes, sources, and mute configuration can effect a group)
+      self._update_groups()
+      self.mark_changes()
+    return resp
 
   def set_zones(self, multi_update: models.MultiZoneUpdate, force_update: bool = False, internal: bool = False) -> ApiResponse:
     """Reconfigures a set of zones
@@ -518,30 +490,131 @@ class Api:
     """
     # aggregate all of the zones together
     all_zids = utils.zones_from_all(self.status, multi_update.zones, multi_update.groups)
-    # update each of the zones
-    resp = ApiResponse.ok()
+    zone_updates = []
     for zid in all_zids:
-      zupdate = multi_update.update.copy() # we potentially need to make changes to the underlying update
+      zupdate = multi_update.update
       if zupdate.name:
+        zupdate = zupdate.copy() # we need to make changes to the underlying update
         # ensure all zones don't get named the same
         zupdate.name = f'{zupdate.name} {zid+1}'
-      resp = self.set_zone(zid, zupdate, force_update=force_update, internal=True)
-      if resp.code != ApiResponse.OK:
-        break # the response message is the internal failure
+      zone_updates.append((zid, zupdate))
+    # update the zones together, writing each preamp's registers once instead of once per zone
+    resp = self._set_zones_by_preamp(zone_updates, force_update=force_update)
     if not internal:
       # update the group stats (individual zone volumes, sources, and mute configuration can effect a group)
       self._update_groups()
       self.mark_changes()
     return resp
 
+  def _set_zones_by_preamp(self, zone_updates: List[Tuple[int, models.ZoneUpdate]], force_update: bool = False) -> ApiResponse:
+    """Reconfigures several zones, making at most one runtime update of each register type per preamp
+
+      The runtime always writes a full preamp's worth of sources or mutes, so this stages every
+      zone's changes first and then flushes them preamp by preamp, instead of once per zone.
+
+      Args:
+        zone_updates: (zone id, changes to zone) pairs
+        force_update: update zones even if no changes have been made (for hw startup)
+      Returns:
+        ApiResponse
+    """
+    zones = self.status.zones
+    sources: Dict[int, int] = {} # zone index -> new source
+    src_changes: Dict[int, List[int]] = {} # preamp -> zone indexes with a new source
+    mute_changes: Dict[int, List[int]] = {} # preamp -> zone indexes to mute before setting volumes
+    unmute_changes: Dict[int, List[int]] = {} # preamp -> zone indexes to unmute after setting volumes
+    vols: Dict[int, int] = {} # zone index -> new volume
+    vol_changes: Dict[int, List[int]] = {} # preamp -> zone indexes with a new volume
+    non_hw_changes = []
+    # stage all of the changes so an invalid update doesn't leave the zones half configured
+    for zid, update in zone_updates:
+      idx, zone = utils.find_indexed(zones, self._zone_idx, zid)
+      if idx is None or zone is None:
+        return ApiResponse.error('set zone: zone {} not found'.format(zid))
+      name, _ = utils.updated_val(update.name, zone.name)
+      source_id, update_source_id = utils.updated_val(update.source_id, zone.source_id)
+      mute, update_mutes = utils.updated_val(update.mute, zone.mute)
+      vol, update_vol = utils.updated_val(update.vol, zone.vol)
+      disabled, _ = utils.updated_val(update.disabled, zone.disabled)
+      try:
+        sid = utils.parse_int(source_id, [0, 1, 2, 3])
+        vol = utils.parse_int(vol, range(-79, 79)) # hold additional state for group delta volume adjustments, output volume will be saturated to 0dB
+      except Exception as exc:
+        return ApiResponse.error('set zone: '  + str(exc))
+      non_hw_changes.append((zone, name, disabled))
+      preamp = idx // 6
+      if update_source_id or force_update:
+        sources[idx] = sid
+        src_changes.setdefault(preamp, []).append(idx)
+      if update_vol or force_update:
+        vols[idx] = vol
+        vol_changes.setdefault(preamp, []).append(idx)
+      # To avoid potential unwanted loud output:
+      # If muting, mute before setting volumes
+      # If un-muting, set desired volume first
+      if update_mutes or force_update:
+        if mute:
+          mute_changes.setdefault(preamp, []).append(idx)
+        else:
+          unmute_changes.setdefault(preamp, []).append(idx)
+
+    # update non hw state
+    for zone, name, disabled in non_hw_changes:
+      zone.name = name
+      zone.disabled = disabled
+
+    try:
+      for preamp, idxs in src_changes.items():
+        for idx in idxs:
+          self._zone_sources[idx] = sources[idx]
+        if not self._rt.update_zone_sources(preamp * 6, self._zone_sources):
+          self._cache_zone_hw_state()
+          return ApiResponse.error('set zone failed: unable to update zone source')
+        for idx in idxs:
+          zones[idx].source_id = sources[idx]
+      for preamp, idxs in mute_changes.items():
+        for idx in idxs:
+          self._zone_mutes[idx] = True
+        if not self._rt.update_zone_mutes(preamp * 6, self._zone_mutes):
+          self._cache_zone_hw_state()
+          return ApiResponse.error('set zone failed: unable to update zone mute')
+        for idx in idxs:
+          zones[idx].mute = True
+      if vol_changes:
+        for idx, vol in vols.items():
+          self._zone_vols[idx] = vol
+        real_vols = [utils.clamp(vol, -79, 0) for vol in self._zone_vols]
+        for preamp, idxs in vol_changes.items():
+          if not self._rt.update_zone_vols(preamp * 6, real_vols):
+            self._cache_zone_hw_state()
+            return ApiResponse.error('set zone failed: unable to update zone volume')
+          for idx in idxs:
+            zones[idx].vol = vols[idx]
+      for idxs in unmute_changes.values():
+        for idx in idxs:
+          self._zone_mutes[idx] = False
+      for preamp, idxs in unmute_changes.items():
+        if not self._rt.update_zone_mutes(preamp * 6, self._zone_mutes):
+          self._cache_zone_hw_state()
+          return ApiResponse.error('set zone failed: unable to update zone mute')
+        for idx in idxs:
+          zones[idx].mute = False
+    except Exception as exc:
+      # the runtime raised part way through, resync the cached arrays with the zones that were updated
+      self._cache_zone_hw_state()
+      return ApiResponse.error('set zone: ' + str(exc))
+    return ApiResponse.ok()
+
   def _update_groups(self) -> None:
     """Updates the group's aggregate fields to maintain consistency and simplify app interface"""
+    # use the cached zone arrays instead of looking up each zone model's fields
+    zone_mutes = self._zone_mutes
+    zone_sources = self._zone_sources
+    zone_vols = self._zone_vols
     for group in self.status.groups:
-      zones = [self.status.zones[z] for z in group.zones]
-      mutes = [z.mute for z in zones]
-      sources = {z.source_id for z in zones}
-      vols = [z.vol for z in zones]
-      vols.sort()
+      mutes = [zone_mutes[z] for z in group.zones]
+      sources = {zone_sources[z] for z in group.zones}
+      vols = sorted(zone_vols[z] for z in group.zones)
       group.mute = False not in mutes # group is only considered muted if all zones are muted
       if len(sources) == 1:
         group.source_id = sources.pop() # TODO: how should we handle different sources in the group?
@@ -561,7 +634,7 @@ class Api:
         Returns:
           'None' on success, otherwise error (dict)
     """
-    _, group = utils.find(self.status.groups, gid)
+    _, group = utils.find_indexed(self.status.groups, self._group_idx, gid)
     if group is None:
       return ApiResponse.error('set group failed, group {} not found'.format(gid))
     name, _ = utils.updated_val(update.name, group.name)
@@ -580,18 +653,17 @@ class Api:
     if vol_change != 0:
       # TODO: make this use volume delta adjustment, for now its a fixed group volume
       zone_update.vol = vol_delta # vol = z.vol + vol_change
-    for zone in [self.status.zones[zone] for zone in zones]:
-      self.set_zone(zone.id, zone_update, internal=True)
-
-    # save the volume
-    group.vol_delta = vol_delta
+    resp = self._set_zones_by_preamp([(zid, zone_update) for zid in zones])
+    if resp.code == ApiResponse.OK:
+      # save the volume
+      group.vol_delta = vol_delta
 
     if not internal:
-      # update the group stats
+      # update the group stats, even on failure some of the zones may have changed
       self._update_groups()
       self.mark_changes()
 
-    return ApiResponse.ok()
+    return resp
 
   def _new_group_id(self):
     """ get next available group id """
@@ -613,6 +685,7 @@ class Api:
 
     # add the new group
     self.status.groups.append(group)
+    self._group_idx.setdefault(group.id, len(self.status.groups) - 1)
 
     # update the group stats and populate uninitialized fields of the group
     self._update_groups()
@@ -624,9 +697,10 @@ class Api:
   def delete_group(self, gid: int) -> ApiResponse:
     """Deletes an existing group"""
     try:
-      i, _ = utils.find(self.status.groups, gid)
+      i, _ = utils.find_indexed(self.status.groups, self._group_idx, gid)
       if i is not None:
         del self.status.groups[i]
+        self._group_idx = utils.index_ids(self.status.groups)
         return ApiResponse.ok()
       return ApiResponse.error('delete group failed: {} does not exist'.format(gid))
     except KeyError:
@@ -825,13 +899,13 @@ class Api:
 
     # execute changes group by group in increasing order
     for group in preset_state.groups or []:
-      _, groups_to_update = utils.find(self.status.groups, group.id)
+      _, groups_to_update = utils.find_indexed(self.status.groups, self._group_idx, group.id)
       if groups_to_update is None:
         raise NameError('group {} does not exist'.format(group.id))
       self.set_group(group.id, group.as_update(), internal=True)
       if group.mute is not None:
         # use the updated group's zones just in case the group's zones were just changed
-        _, g_updated = utils.find(self.status.groups, group.id)
+        _, g_updated = utils.find_indexed(self.status.groups, self._group_idx, group.id)
         if g_updated is not None:
           zones_changed = g_updated.zones
           if group.mute:
@@ -887,10 +961,11 @@ class Api:
       id=9999,
       name='Restore last config',
       last_used=None, # this need to be in javascript time format
+      # PresetState validation converts each item into a new *UpdateWithId model, so no explicit copy is needed
       state=models.PresetState(
-        sources=deepcopy(status.sources),
-        zones=deepcopy(status.zones),
-        groups=deepcopy(status.groups)
+        sources=status.sources,
+        zones=status.zones,
+        groups=status.groups
       )
     )
     if last_pid is None:
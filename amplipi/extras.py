@@ -22,16 +22,17 @@ Additional AmpliPi methods
 from amplipi import models
 from amplipi import utils
 
+_VOL_STR_LEN = 20
+# every possible volume bar, with the slider '|' placed at each spot
+_VOL_STRS = tuple('-' * i + '|' + '-' * (_VOL_STR_LEN - 1 - i) for i in range(_VOL_STR_LEN))
+
 def vol_string(vol, min_vol=-79, max_vol=0):
   """ Make a visual representation of a volume """
   vol_range = max_vol - min_vol + 1
-  vol_str_len = 20
-  vol_scale = vol_range / vol_str_len
+  vol_scale = vol_range / _VOL_STR_LEN
   vol_level = int((vol - min_vol)  / vol_scale)
-  assert 0 <= vol_level < vol_str_len
-  vol_str = ['-'] * vol_str_len
-  vol_str[vol_level] = '|' # place the volume slider bar at its current spot
-  return ''.join(vol_str) # turn that char array into a string
+  assert 0 <= vol_level < _VOL_STR_LEN
+  return _VOL_STRS[vol_level]
 
 def visualize_api(status : models.Status):
   """Creates a command line visualization of the system state, mostly the volume levels of each zone and group
@@ -219,30 +219,79 @@ class _Preamps:
                             0x4F,
                           ]
 
-  def write_byte_data(self, preamp_addr, reg, data):
+  def _mirror_write(self, preamp_addr: int, reg: int, data: int) -> bool:
+    """ Record a register write in the preamp register mirror
+
+      The bus has a single master, so the mirror always knows what each register holds.
+
+      Returns:
+        True if the write needs to be sent, False if the preamp is not connected
+        or the register already holds @data
+    """
     assert preamp_addr in _DEV_ADDRS
-    assert type(preamp_addr) == int
-    assert type(reg) == int
-    assert type(data) == int
+    assert isinstance(preamp_addr, int)
+    assert isinstance(reg, int)
+    assert isinstance(data, int)
     # dynamically update preamps (to support mock)
     if preamp_addr not in self.preamps:
       if self.bus is None:
         self.new_preamp(preamp_addr)
       else:
-        return None # Preamp is not connected, do nothing
+        return False # Preamp is not connected, do nothing
+    if self.preamps[preamp_addr][reg] == data:
+      return False # Register already holds this value, skip the write
 
     if DEBUG_PREAMPS:
       print("writing to 0x{:02x} @ 0x{:02x} with 0x{:02x}".format(preamp_addr, reg, data))
     self.preamps[preamp_addr][reg] = data
+    return True
+
+  def _forget_writes(self, writes: List[Tuple[int, int, int]]):
+    """ Mark registers as unknown after a failed write so they are resent next time """
+    for preamp_addr, reg, _ in writes:
+      if preamp_addr in self.preamps:
+        self.preamps[preamp_addr][reg] = -1
+
+  def _send(self, preamp_addr: int, reg: int, data: int):
+    """ Send a single register write, reconnecting to the bus and retrying once on failure """
+    assert self.bus is not None
+    try:
+      time.sleep(0.001) # space out sequential calls to avoid bus errors
+      self.bus.write_byte_data(preamp_addr, reg, data)
+    except Exception:
+      time.sleep(0.001)
+      self.bus = SMBus(1)
+      self.bus.write_byte_data(preamp_addr, reg, data)
+
+  def write_byte_data(self, preamp_addr, reg, data):
+    if not self._mirror_write(preamp_addr, reg, data):
+      return None
     # TODO: need to handle volume modifying mute state in mock
     if self.bus is not None:
       try:
-        time.sleep(0.001) # space out sequential calls to avoid bus errors
-        self.bus.write_byte_data(preamp_addr, reg, data)
+        self._send(preamp_addr, reg, data)
       except Exception:
-        time.sleep(0.001)
-        self.bus = SMBus(1)
-        self.bus.write_byte_data(preamp_addr, reg, data)
+        self._forget_writes([(preamp_addr, reg, data)])
+        raise
+
+  def write_regs(self, writes: List[Tuple[int, int, int]]):
+    """ Write a set of registers
+
+      The preamp firmware only accepts one data byte per write and expects a STOP after it,
+      so each register is sent as its own write, spaced out like write_byte_data.
+      Registers that already hold the requested value are not rewritten.
+
+      Args:
+        writes: list of (preamp_addr, reg, data) to write, in order
+    """
+    changed = [(preamp_addr, reg, data) for preamp_addr, reg, data in writes if self._mirror_write(preamp_addr, reg, data)]
+    if self.bus is not None:
+      for i, (preamp_addr, reg, data) in enumerate(changed):
+        try:
+          self._send(preamp_addr, reg, data)
+        except Exception:
+          self._forget_writes(changed[i:]) # the earlier writes made it to the preamps
+          raise
 
   def probe_preamp(self, addr: int):
     # Scan for preamps, and set source registers to be completely digital
@@ -477,8 +526,7 @@ class Mock:
         True on success, False on hw failure
     """
     assert len(digital) == 4
-    for flag in digital:
-      assert isinstance(flag, bool)
+    assert all(isinstance(flag, bool) for flag in digital)
     return True
 
   def update_zone_mutes(self, zone, mutes):
@@ -492,11 +540,8 @@ class Mock:
         True on success, False on hw failure
     """
     assert len(mutes) >= 6
-    num_preamps = int(len(mutes) / 6)
-    assert len(mutes) == num_preamps * 6
-    for preamp in range(num_preamps):
-      for zid in range(6):
-        assert isinstance(mutes[preamp * 6 + zid], bool)
+    assert len(mutes) % 6 == 0
+    assert all(isinstance(mute, bool) for mute in mutes)
     return True
 
   def update_zone_sources(self, zone, sources):
@@ -510,12 +555,8 @@ class Mock:
         True on success, False on hw failure
     """
     assert len(sources) >= 6
-    num_preamps = int(len(sources) / 6)
-    assert len(sources) == num_preamps * 6
-    for preamp in range(num_preamps):
-      for zid in range(6):
-        src = sources[preamp * 6 + zid]
-        assert isinstance(src, int) or src is None
+    assert len(sources) % 6 == 0
+    assert all(isinstance(src, int) or src is None for src in sources)
     return True
 
   def update_zone_vol(self, zone, vol):
@@ -534,6 +575,22 @@ class Mock:
     assert 0 >= vol >= -79
     return True
 
+  def update_zone_vols(self, zone, vols):
+    """ Update the volumes of all of the zones on a preamp
+
+      Args:
+        zone int: any zone on the preamp to update
+        vols [int*zones]: array of volumes for zones, each in range[-79, 0]
+
+      Returns:
+        True on success, False on hw failure
+    """
+    assert len(vols) >= 6
+    assert len(vols) % 6 == 0
+    assert 0 <= zone // 6 <= 5
+    assert all(0 >= vol >= -79 for vol in vols)
+    return True
+
   def exists(self, zone):
       return True
 
@@ -562,29 +619,26 @@ class Rpi:
         True on success, False on hw failure
     """
     assert len(mutes) >= 6
-    num_preamps = int(len(mutes) / 6)
-    assert len(mutes) == num_preamps * 6
+    assert len(mutes) % 6 == 0
     preamp = zone // 6
-    mute_cfg = 0x00
-    for z in range(6):
-      assert type(mutes[preamp * 6 + z]) == bool
-      if mutes[preamp * 6 + z]:
-        mute_cfg = mute_cfg | (0x01 << z)
-    self._bus.write_byte_data(_DEV_ADDRS[preamp], _REG_ADDRS['MUTE'], mute_cfg)
+    assert all(isinstance(mute, bool) for mute in mutes[preamp * 6:preamp * 6 + 6])
+    # zone 1 is the lowest bit
+    mute_cfg = sum(1 << z for z, mute in enumerate(mutes[preamp * 6:preamp * 6 + 6]) if mute)
+    writes = [(_DEV_ADDRS[preamp], _REG_ADDRS['MUTE'], mute_cfg)]
 
     # Audio power needs to be on each box when subsequent boxes are playing audio
     all_muted = False not in mutes
-    if self._all_muted != all_muted:
-      if all_muted:
-        for p in self._bus.preamps.keys():
-          # Standby all preamps
-          self._bus.write_byte_data(p, _REG_ADDRS['STANDBY'], 0x00)
-        time.sleep(0.1)
-      else:
-        for p in self._bus.preamps.keys():
-          # Unstandby all preamps
-          self._bus.write_byte_data(p, _REG_ADDRS['STANDBY'], 0x3F)
-        time.sleep(0.3)
+    standby_changed = self._all_muted != all_muted
+    if standby_changed:
+      # Standby all preamps when everything is muted, otherwise unstandby them all
+      stby_cfg = 0x00 if all_muted else 0x3F
+      writes += [(p, _REG_ADDRS['STANDBY'], stby_cfg) for p in self._bus.preamps.keys()]
+
+    # write the mute register, then any standby changes
+    self._bus.write_regs(writes)
+
+    if standby_changed:
+      time.sleep(0.1 if all_muted else 0.3)
       self._all_muted = all_muted
     return True
 
@@ -599,21 +653,19 @@ class Rpi:
         True on success, False on hw failure
     """
     assert len(sources) >= 6
-    num_preamps = int(len(sources) / 6)
-    assert len(sources) == num_preamps * 6
+    assert len(sources) % 6 == 0
     preamp = zone // 6
 
-    source_cfg123 = 0x00
-    source_cfg456 = 0x00
-    for z in range(6):
-      src = sources[preamp * 6 + z]
-      assert type(src) == int or src == None
-      if z < 3:
-        source_cfg123 = source_cfg123 | (src << (z*2))
-      else:
-        source_cfg456 = source_cfg456 | (src << ((z-3)*2))
-    self._bus.write_byte_data(_DEV_ADDRS[preamp], _REG_ADDRS['ZONE123_SRC'], source_cfg123)
-    self._bus.write_byte_data(_DEV_ADDRS[preamp], _REG_ADDRS['ZONE456_SRC'], source_cfg456)
+    preamp_srcs = sources[preamp * 6:preamp * 6 + 6]
+    assert all(isinstance(src, int) or src is None for src in preamp_srcs)
+    # pack each zone's 2-bit source directly, a disconnected (None) zone is sent as source 0
+    src1, src2, src3, src4, src5, src6 = [src or 0 for src in preamp_srcs]
+    source_cfg123 = src1 | (src2 << 2) | (src3 << 4)
+    source_cfg456 = src4 | (src5 << 2) | (src6 << 4)
+    self._bus.write_regs([
+      (_DEV_ADDRS[preamp], _REG_ADDRS['ZONE123_SRC'], source_cfg123),
+      (_DEV_ADDRS[preamp], _REG_ADDRS['ZONE456_SRC'], source_cfg456),
+    ])
 
     # TODO: Add error checking on successful write
     return True
@@ -628,7 +680,7 @@ class Rpi:
       Returns:
         True on success, False on hw failure
     """
-    preamp = int(zone / 6) # int(x/y) does the same thing as (x // y)
+    preamp = zone // 6
     assert zone >= 0
     assert preamp < 15
     assert vol <= 0 and vol >= -79
@@ -642,6 +694,29 @@ class Rpi:
     # TODO: Add error checking on successful write
     return True
 
+  def update_zone_vols(self, zone, vols):
+    """ Update the volumes of all of the zones on a preamp
+
+      Each volume register is still its own register write,
+      registers that are unchanged are skipped by the preamp interface.
+
+      Args:
+        zone int: any zone on the preamp to update
+        vols [int*zones]: array of volumes for zones, each in range[-79, 0]
+
+      Returns:
+        True on success, False on hw failure
+    """
+    assert len(vols) >= 6
+    assert len(vols) % 6 == 0
+    preamp = zone // 6
+    preamp_vols = vols[preamp * 6:preamp * 6 + 6]
+    assert all(0 >= vol >= -79 for vol in preamp_vols)
+    self._bus.write_regs([(_DEV_ADDRS[preamp], _REG_ADDRS['VOL_ZONE1'] + chan, abs(vol)) for chan, vol in enumerate(preamp_vols)])
+
+    # TODO: Add error checking on successful write
+    return True
+
   def update_sources(self, digital):
     """ modify all of the 4 system sources
 
@@ -653,17 +728,11 @@ class Rpi:
         True on success, False on hw failure
     """
 
-    # Start with a fresh byte - only update on Digital (True)
-    output = 0x00
-
-    # When digital is true, set the appropriate bit to 1
     assert len(digital) == 4
-    for d in digital:
-      assert type(d) == bool
+    assert all(isinstance(d, bool) for d in digital)
 
-    for i in range(4):
-      if digital[i]:
-        output = output | (0x01 << i)
+    # When digital is true, set the appropriate bit to 1
+    output = sum(1 << i for i, dig in enumerate(digital) if dig)
 
     # Send out the updated source information to the appropriate preamp
     self._bus.write_byte_data(_DEV_ADDRS[0], _REG_ADDRS['SRC_AD'], output)
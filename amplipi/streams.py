@@ -25,7 +25,7 @@ import os
 import sys
 import subprocess
 import time
-from typing import Union
+from typing import Callable, Dict, List, Tuple, Union
 import threading
 
 # Used by InternetRadio and Spotify
@@ -215,6 +215,14 @@ class AirPlay(BaseStream):
 
 class Spotify(BaseStream):
   """ A Spotify Stream """
+  # command -> bytes to send to the spotify metadata socket
+  _SUPPORTED_CMDS = {
+    'play': [0x05],
+    'pause': [0x04],
+    'next': [0x07],
+    'prev': [0x08]
+  }
+
   def __init__(self, name, mock=False):
     super().__init__('spotify', name, mock)
     self.proc2 = None
@@ -306,12 +314,7 @@ class Spotify(BaseStream):
     Commands include play, pause, next, and previous
     Takes src as an input so that it knows which UDP port to send on
     """
-    supported_cmds = {
-      'play': [0x05],
-      'pause': [0x04],
-      'next': [0x07],
-      'prev': [0x08]
-    }
+    supported_cmds = self._SUPPORTED_CMDS
     udp_ip = "127.0.0.1" # AmpliPi's IP
     udp_port = self.metaport + 1 # Adding 1 to the 'metaport' variable used in connect()
 
@@ -325,6 +328,17 @@ class Spotify(BaseStream):
 
 class Pandora(BaseStream):
   """ A Pandora Stream """
+  # command -> pianobar control fifo command and the expected state after it executes
+  _SUPPORTED_CMDS = {
+    'play':   {'cmd': 'P\n', 'state': 'playing'},
+    'pause':  {'cmd': 'S\n', 'state': 'paused'},
+    'stop':   {'cmd': 'q\n', 'state': 'stopped'},
+    'next':   {'cmd': 'n\n', 'state': 'playing'},
+    'love':   {'cmd': '+\n', 'state': None}, # love does not change state
+    'ban':    {'cmd': '-\n', 'state': 'playing'},
+    'shelve': {'cmd': 't\n', 'state': 'playing'},
+  }
+
   def __init__(self, name, user, password, station, mock=False):
     super().__init__('pandora', name, mock)
     self.user = user
@@ -437,15 +451,7 @@ class Pandora(BaseStream):
       cmd: Command string sent to pianobar's control fifo
       state: Expected state after successful command execution
     """
-    supported_cmds = {
-      'play':   {'cmd': 'P\n', 'state': 'playing'},
-      'pause':  {'cmd': 'S\n', 'state': 'paused'},
-      'stop':   {'cmd': 'q\n', 'state': 'stopped'},
-      'next':   {'cmd': 'n\n', 'state': 'playing'},
-      'love':   {'cmd': '+\n', 'state': None}, # love does not change state
-      'ban':    {'cmd': '-\n', 'state': 'playing'},
-      'shelve': {'cmd': 't\n', 'state': 'playing'},
-    }
+    supported_cmds = self._SUPPORTED_CMDS
 
     try:
       if cmd in supported_cmds:
@@ -868,26 +874,28 @@ class FMRadio(BaseStream):
 # Simple handling of stream types before we have a type heirarchy
 AnyStream = Union[AirPlay, Spotify, InternetRadio, DLNA, Pandora, Plexamp, FilePlayer, FMRadio]
 
+# stream type -> (stream class, required constructor args, optional constructor kwargs)
+_STREAM_BUILDERS: Dict[str, Tuple[Callable[..., AnyStream], List[str], List[str]]] = {
+  'pandora':       (Pandora, ['name', 'user', 'password'], ['station']),
+  'shairport':     (AirPlay, ['name'], []), # handle older configs
+  'airplay':       (AirPlay, ['name'], []),
+  'spotify':       (Spotify, ['name'], []),
+  'dlna':          (DLNA, ['name'], []),
+  'internetradio': (InternetRadio, ['name', 'url', 'logo'], []),
+  'plexamp':       (Plexamp, ['name', 'client_id', 'token'], []),
+  'fileplayer':    (FilePlayer, ['name', 'url'], []),
+  'fmradio':       (FMRadio, ['name', 'freq', 'logo'], []),
+}
+
 def build_stream(stream: models.Stream, mock=False) -> AnyStream:
   """ Build a stream from the generic arguments given in stream, discriminated by stream.type
 
   we are waiting on Pydantic's implemenatation of discriminators to fully integrate streams into our model definitions
   """
   args = stream.dict(exclude_none=True)
-  if stream.type == 'pandora':
-    return Pandora(args['name'], args['user'], args['password'], station=args.get('station'), mock=mock)
-  elif stream.type == 'shairport' or stream.type == 'airplay': # handle older configs
-    return AirPlay(args['name'], mock=mock)
-  elif stream.type == 'spotify':
-    return Spotify(args['name'], mock=mock)
-  elif stream.type == 'dlna':
-    return DLNA(args['name'], mock=mock)
-  elif stream.type == 'internetradio':
-    return InternetRadio(args['name'], args['url'], args['logo'], mock=mock)
-  elif stream.type == 'plexamp':
-    return Plexamp(args['name'], args['client_id'], args['token'], mock=mock)
-  elif stream.type == 'fileplayer':
-    return FilePlayer(args['name'], args['url'], mock=mock)
-  elif stream.type == 'fmradio':
-    return FMRadio(args['name'], args['freq'], args['logo'], mock=mock)
-  raise NotImplementedError(stream.type)
+  try:
+    stream_class, required_args, optional_args = _STREAM_BUILDERS[stream.type]
+  except KeyError as exc:
+    raise NotImplementedError(stream.type) from exc
+  kwargs = {arg: args.get(arg) for arg in optional_args}
+  return stream_class(*[args[arg] for arg in required_args], mock=mock, **kwargs)
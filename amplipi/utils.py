@@ -70,6 +70,20 @@ def find(items: Iterable[BT], item_id: int, key='id') -> Union[Tuple[int, BT], T
       return i, item
   return None, None
 
+def index_ids(items: Iterable[BT], key='id') -> Dict[int, int]:
+  """ Map each item's id to its position in @items, for repeated lookups with find_indexed """
+  index: Dict[int, int] = {}
+  for i, item in enumerate(items):
+    index.setdefault(item.__dict__[key], i) # like find, the first item with an id wins
+  return index
+
+def find_indexed(items: List[BT], index: Dict[int, int], item_id: int, key='id') -> Union[Tuple[int, BT], Tuple[None, None]]:
+  """ Find an item by id using an index from index_ids, falling back to a linear search if the index is stale """
+  i = index.get(item_id)
+  if i is not None and i < len(items) and items[i].__dict__[key] == item_id:
+    return i, items[i]
+  return find(items, item_id, key)
+
 def next_available_id(items: Iterable[BT], default: int = 0) -> int:
   """ Get a new unique id among @items """
   # TODO; use `largest_item = max(items, key=lambda item: item.id, default=None)` to find max if models.Base changes id to be required
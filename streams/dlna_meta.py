@@ -7,6 +7,7 @@ import sys
 import re
 import argparse
 import os
+import io
 
 # parse the log file generated by gmrender-resurrect, extracting out the track info
 
@@ -29,40 +30,52 @@ cs_loc = '{}/currentSong'.format(args.dlna_config_dir)
 cs_conf = {
     'state': 'playing'
 }
-ctmd = re.compile(r'dc:(.*?)>(.*?)</dc:|upnp:(.*?)>(.*?)</upnp:')
-ts = re.compile(r'TransportState: ([A-Z]*)')
+# transport state and track metadata (dc:/upnp: tags) are matched in a single pass over each line
+meta = re.compile(r'TransportState: (?P<state>[A-Z]*)|dc:(?P<dc_tag>.*?)>(?P<dc_val>.*?)</dc:|upnp:(?P<upnp_tag>.*?)>(?P<upnp_val>.*?)</upnp:')
+
+# read the log in large chunks and split lines out of memory, only decoding the lines we use
+stdin = io.BufferedReader(sys.stdin.buffer.raw, 65536)
 
 def read_field():
-  line = sys.stdin.readline()
-  line = line.strip('\n')
-  if line[0:4] == "INFO":
-    s1 = line.split('] ')
+  line = stdin.readline()
+  if not line:
+    raise EOFError('dlna log closed')
+  if line[0:4] == b'INFO':
+    s1 = line.rstrip(b'\n').decode(errors='replace').split('] ')
     return s1[1]
   else:
     return None
 
 def meta_parser(fstring):
   u = {}
-  for m in ts.finditer(fstring):
-    if m[1]:
-      phs = m[1].lower()
-      u['state'] = phs
-  for n in ctmd.finditer(fstring):
-    if n[1]:
-      u[n[1]] = n[2]
+  for m in meta.finditer(fstring):
+    if m['state'] is not None:
+      if m['state']:
+        u['state'] = m['state'].lower()
+    elif m['dc_tag'] is not None:
+      u[m['dc_tag']] = m['dc_val']
     else:
-      u[n[3]] = n[4]
+      u[m['upnp_tag']] = m['upnp_val']
   return u
 
-f = open(cs_loc, 'w')
-f.write("")
-f.close()
+# start with an empty currentSong
+open(cs_loc, 'w').close()
+cs_tmp = cs_loc + '.tmp'
+last_written = ''
 
 while True:
-  field = read_field()
+  try:
+    field = read_field()
+  except EOFError:
+    break # nothing left to translate, avoid spinning on a closed pipe
   if field:
     cs_conf.update(meta_parser(field))
-    print(cs_conf)
-    f = open(cs_loc, 'w')
-    f.write(str(cs_conf))
-    f.close()
+    cs_str = str(cs_conf)
+    # most log lines don't change the metadata, only rewrite currentSong when it does
+    if cs_str != last_written:
+      print(cs_conf)
+      # write to a temporary file and swap it in so readers see either the old or the new metadata, never a mix
+      with open(cs_tmp, 'w') as cs_file:
+        cs_file.write(cs_str)
+      os.replace(cs_tmp, cs_loc)
+      last_written = cs_str
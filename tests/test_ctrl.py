@@ -10,6 +10,8 @@ import os
 import tempfile
 from copy import deepcopy
 
+import pytest
+
 # use the internal amplipi library
 from context import amplipi
 
@@ -138,6 +140,174 @@ def test_doubly_missing_config():
   api = api_w_mock_rt(NO_CONFIG, backup_config=NO_CONFIG)
   assert DEFAULT_STATUS == prune_state(api.get_state())
 
+def read_file(file_path):
+  """ Read a config file """
+  with open(file_path) as cfg:
+    return cfg.read()
+
+def test_save_unchanged_config():
+  """ Test that saving an unchanged config doesn't rewrite the config or its backup """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_mock_rt(GOOD_CONFIG)
+  api.save()
+  delete_file(CONFIG_FILE_BACKUP)
+  api.save()
+  assert not os.path.exists(CONFIG_FILE_BACKUP)
+  assert not os.path.exists(CONFIG_FILE + '.tmp')
+
+def test_save_changed_config():
+  """ Test that saving a changed config replaces the config and keeps the old one as the backup """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_mock_rt(GOOD_CONFIG)
+  api.save()
+  old_config = read_file(CONFIG_FILE)
+  api.status.zones[0].name = 'Changed Zone'
+  api.save()
+  assert read_file(CONFIG_FILE_BACKUP) == old_config
+  assert json.loads(read_file(CONFIG_FILE))['zones'][0]['name'] == 'Changed Zone'
+  assert not os.path.exists(CONFIG_FILE + '.tmp')
+
+def test_save_failed(monkeypatch):
+  """ Test that a failed save doesn't leave a temporary config file behind """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_mock_rt(GOOD_CONFIG)
+  def failed_replace(src, dst):
+    raise OSError('disk full')
+  monkeypatch.setattr(amplipi.ctrl.os, 'replace', failed_replace)
+  api.status.zones[0].name = 'Changed Zone'
+  api.save()
+  assert not os.path.exists(CONFIG_FILE + '.tmp')
+  assert read_file(CONFIG_FILE) == GOOD_CONFIG
+
+def test_set_group_one_update_per_preamp():
+  """ Test that a group's zone sources are updated with one runtime call per preamp """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_rpi_rt(GOOD_CONFIG)
+  calls = []
+  update_zone_sources = api._rt.update_zone_sources
+  def counted_update(zone, sources):
+    calls.append(zone)
+    return update_zone_sources(zone, sources)
+  api._rt.update_zone_sources = counted_update
+  assert api.set_group(100, amplipi.models.GroupUpdate(source_id=2, mute=False)).code == amplipi.ctrl.ApiCode.OK
+  assert len(calls) == 1
+  assert all(z.source_id == 2 and not z.mute for z in api.status.zones)
+  regs = api._rt._bus.preamps[0x08]
+  assert regs[0x01] == 0b101010 and regs[0x02] == 0b101010 # ZONE123_SRC and ZONE456_SRC
+  assert regs[0x03] == 0 # MUTE
+
+def test_set_zone_runtime_error(monkeypatch):
+  """ Test that a runtime exception while updating a zone leaves the zone caches consistent """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_rpi_rt(GOOD_CONFIG)
+  def failed_update(zone, state):
+    raise OSError('i2c fail')
+  monkeypatch.setattr(api._rt, 'update_zone_sources', failed_update)
+  monkeypatch.setattr(api._rt, 'update_zone_mutes', failed_update)
+  assert api.set_zone(3, amplipi.models.ZoneUpdate(source_id=2)).code == amplipi.ctrl.ApiCode.ERROR
+  assert api.set_zone(3, amplipi.models.ZoneUpdate(mute=False)).code == amplipi.ctrl.ApiCode.ERROR
+  zones = api.status.zones
+  assert zones[3].source_id == 0 and zones[3].mute
+  assert api._zone_sources == [z.source_id for z in zones]
+  assert api._zone_mutes == [z.mute for z in zones]
+
+def test_set_group_runtime_error(monkeypatch):
+  """ Test that a runtime exception while updating a group is returned as an error and keeps the zone caches consistent """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_rpi_rt(GOOD_CONFIG)
+  def failed_update(zone, mutes):
+    raise OSError('i2c fail')
+  monkeypatch.setattr(api._rt, 'update_zone_mutes', failed_update)
+  notified = []
+  api._change_notifier = notified.append
+  resp = api.set_group(100, amplipi.models.GroupUpdate(source_id=2, mute=False, name='renamed'))
+  assert resp.code == amplipi.ctrl.ApiCode.ERROR and 'i2c fail' in resp.msg
+  zones = api.status.zones
+  assert all(z.source_id == 2 and z.mute for z in zones[0:6]) # the sources are set before unmuting
+  assert api._zone_sources == [z.source_id for z in zones]
+  assert api._zone_mutes == [z.mute for z in zones]
+  # the partial change is still reflected in the group and reported
+  group = api.status.groups[0]
+  assert group.name == 'renamed' and group.source_id == 2 and group.mute
+  assert len(notified) == 1
+
+def test_set_zones_runtime_error(monkeypatch):
+  """ Test that a runtime exception while updating several zones is returned as an error """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api = api_w_rpi_rt(GOOD_CONFIG)
+  def failed_update(zone, sources):
+    raise OSError('i2c fail')
+  monkeypatch.setattr(api._rt, 'update_zone_sources', failed_update)
+  update = amplipi.models.MultiZoneUpdate(zones=[0, 1, 2], update=amplipi.models.ZoneUpdate(source_id=3))
+  resp = api.set_zones(update)
+  assert resp.code == amplipi.ctrl.ApiCode.ERROR and 'i2c fail' in resp.msg
+  assert all(z.source_id == 0 for z in api.status.zones)
+  assert api._zone_sources == [z.source_id for z in api.status.zones]
+
+class FakeBus:
+  """ Stand-in for smbus2.SMBus that records register writes, failing the next @failures of them """
+  def __init__(self):
+    self.writes = []
+    self.failures = 0
+
+  def write_byte_data(self, addr, reg, data):
+    if self.failures > 0:
+      self.failures -= 1
+      raise OSError('i2c fail')
+    self.writes.append((addr, reg, data))
+
+  def close(self):
+    pass
+
+def api_w_fake_bus(monkeypatch):
+  """ Make an api using the rpi runtime connected to a FakeBus, reconnecting to the bus gets the same FakeBus """
+  api = api_w_rpi_rt(GOOD_CONFIG)
+  bus = FakeBus()
+  api._rt._bus.bus = bus
+  monkeypatch.setattr(amplipi.rt, 'SMBus', lambda _: bus)
+  return api, bus
+
+def test_write_regs(monkeypatch):
+  """ Test that write_regs sends each changed register as its own write and retries once on failure """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api, bus = api_w_fake_bus(monkeypatch)
+  preamps = api._rt._bus
+  preamps.write_regs([(0x08, 0x01, 0b010101), (0x08, 0x02, 0b010101), (0x08, 0x03, 0x3F)])
+  assert bus.writes == [(0x08, 0x01, 0b010101), (0x08, 0x02, 0b010101)] # the mute register already holds 0x3F
+  # a single failure is retried on a new connection
+  bus.writes.clear()
+  bus.failures = 1
+  preamps.write_regs([(0x08, 0x01, 0b101010)])
+  assert bus.writes == [(0x08, 0x01, 0b101010)]
+  # a failed retry is raised, and the unsent registers are marked unknown
+  bus.writes.clear()
+  bus.failures = 2
+  with pytest.raises(OSError):
+    preamps.write_regs([(0x08, 0x01, 0), (0x08, 0x02, 0)])
+  assert bus.writes == []
+  assert preamps.preamps[0x08][0x01] == -1 and preamps.preamps[0x08][0x02] == -1
+
+def test_set_zone_skips_unchanged_registers(monkeypatch):
+  """ Test that rewriting a zone with its current configuration sends nothing to the preamps """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api, bus = api_w_fake_bus(monkeypatch)
+  zone = api.status.zones[0]
+  update = amplipi.models.ZoneUpdate(source_id=zone.source_id, mute=zone.mute, vol=zone.vol)
+  assert api.set_zone(0, update, force_update=True).code == amplipi.ctrl.ApiCode.OK
+  assert bus.writes == []
+
+def test_set_zone_resends_after_failure(monkeypatch):
+  """ Test that a register is marked unknown after a failed write, so the next write to it is sent """
+  use_tmpdir() # run from temp dir so we don't mess with current directory
+  api, bus = api_w_fake_bus(monkeypatch)
+  vol_reg = 0x05 # VOL_ZONE1
+  bus.failures = 2
+  assert api.set_zone(0, amplipi.models.ZoneUpdate(vol=-30)).code == amplipi.ctrl.ApiCode.ERROR
+  assert api._rt._bus.preamps[0x08][vol_reg] == -1
+  assert bus.writes == []
+  assert api.set_zone(0, amplipi.models.ZoneUpdate(vol=-30)).code == amplipi.ctrl.ApiCode.OK
+  assert bus.writes == [(0x08, vol_reg, 30)]
+
 if __name__ == '__main__':
   # run tests without pytest
   test_no_config()